@@ -1,4 +1,5 @@
 import sys
+import zlib
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QLineEdit, QSlider, QLabel,
@@ -6,6 +7,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt6 import QtGui
 import qdarktheme
 
@@ -14,8 +16,10 @@ from .watermark import *
 
 
 class FileDropLabel(QLabel):
+    files_dropped = pyqtSignal(list)
+
     def __init__(self):
-        super().__init__('\n\n Drop PDF or Image File Here \n\n')
+        super().__init__('\n\n Drop PDF, Image or Archive File Here \n\n')
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setStyleSheet('QLabel { border: 2px dashed #aaa; }')
         self.setAcceptDrops(True)
@@ -23,19 +27,18 @@ class FileDropLabel(QLabel):
 
     def is_allowed_file(self, file_path):
         '''
-        Check if the file is a PDF or image.
+        Check if the file is a PDF, image or archive.
         :param file_path: Path to the file
-        :return: True if the file is a PDF or image, False otherwise
+        :return: True if the file is a PDF, image or archive, False otherwise
         '''
 
-        ext = file_path.lower().rsplit('.', 1)[-1]
-        return f'.{ext}' in SUPPORTED_IMAGE_FORMATS
+        return is_img(file_path) or is_archive(file_path)
 
     def dragEnterEvent(self, event):
         '''
         Handle the drag enter event.
         The event contains the file paths of the dragged files.
-        If the file is a PDF or image, accept the event.
+        If the file is a PDF, image or archive, accept the event.
         :param event: The drag enter event
         :return: None
         '''
@@ -55,7 +58,7 @@ class FileDropLabel(QLabel):
         '''
         Handle the drop event.
         The event contains the file paths of the dropped files.
-        If the file is a PDF or image, display its path.
+        If the file is a PDF, image or archive, display its path.
         If not, display an error message.
         :param event: The drop event
         '''
@@ -67,13 +70,64 @@ class FileDropLabel(QLabel):
             if allowed_files:
                 self.setText('Files:\n' + '\n'.join(allowed_files))
                 event.accept()
+                self.files_dropped.emit(allowed_files)
             else:
-                self.setText('Only PDF or image files are allowed!')
+                self.setText('Only PDF, image or archive files are allowed!')
                 event.ignore()
         else:
             event.ignore()
 
 
+class PreviewSignals(QObject):
+    done = pyqtSignal(int, str, object, object, QtGui.QImage)
+    failed = pyqtSignal(int, str)
+
+
+class PreviewWorker(QRunnable):
+    def __init__(self, generation, is_stale, file_path, base, marked,
+        watermark_kwargs, noise_kwargs):
+        super().__init__()
+        self.generation = generation
+        self.is_stale = is_stale
+        self.file_path = file_path
+        self.base = base
+        self.marked = marked
+        self.watermark_kwargs = watermark_kwargs
+        self.noise_kwargs = noise_kwargs
+        self.signals = PreviewSignals()
+
+    def run(self):
+        '''
+        Render the preview off the UI thread.
+        The base raster and the watermark layer are only rendered if they
+        are not cached yet, then the noise layer is added on top of them.
+        '''
+
+        # A newer request superseded this one while it was queued
+        if self.is_stale(self.generation):
+            return
+
+        # An exception escaping run() would abort the whole application
+        try:
+            base = self.base
+            if base is None:
+                base = render_preview_base(self.file_path)
+
+            marked = self.marked
+            if marked is None:
+                marked = render_preview_watermark(base, **self.watermark_kwargs)
+
+            img = render_preview_noise(marked, base[2], **self.noise_kwargs)
+            data = img.tobytes()
+            qimg = QtGui.QImage(data, img.width, img.height, 3 * img.width,
+                QtGui.QImage.Format.Format_RGB888).copy()
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+
+        self.signals.done.emit(self.generation, self.file_path, base, marked, qimg)
+
+
 class WatermarkWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -81,6 +135,7 @@ class WatermarkWindow(QWidget):
         self.setWindowIcon(QtGui.QIcon(WINDOW_ICON))
 
         self.center()
+        main_layout = QHBoxLayout()
         layout = QVBoxLayout()
 
         # File drag and drop widget
@@ -105,6 +160,7 @@ class WatermarkWindow(QWidget):
             self.slider_spacing_label.setText(f'{value:.2f}')
 
         self.slider_spacing.valueChanged.connect(update_spacing_label)
+        self.slider_spacing.valueChanged.connect(self.schedule_preview)
 
         self.slider_spacing_layout.addWidget(QLabel('Spacing:'))
         self.slider_spacing_layout.addWidget(self.slider_spacing)
@@ -126,6 +182,10 @@ class WatermarkWindow(QWidget):
             self.noise_checkbox_layout.addWidget(label)
             self.noise_checkbox_layout.addWidget(checkbox)
 
+        # Only Date, Noise and Bands change what the page looks like
+        for checkbox in self.checkboxes[:3]:
+            checkbox.stateChanged.connect(self.schedule_preview)
+
         self.noise_checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addLayout(self.noise_checkbox_layout)
 
@@ -134,7 +194,33 @@ class WatermarkWindow(QWidget):
         self.submit_button.clicked.connect(self.click_submit)
         layout.addWidget(self.submit_button)
 
-        self.setLayout(layout)
+        # Preview pane
+        self.preview_label = QLabel('Preview')
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setFixedSize(*PREVIEW_SIZE)
+        self.preview_label.setStyleSheet('QLabel { border: 1px solid #555; }')
+
+        # Preview state: cached base rasters, cached watermark layer of the
+        # last options, font and pending requests
+        self.preview_cache = {}
+        self.preview_marked = (None, None)
+        self.preview_key = None
+        self.preview_font = random_font(AVAILABLE_FONTS)
+        self.preview_font_size = random_font_size(FONT_SIZE_RANGE)
+        self.preview_generation = 0
+        self.preview_pool = QThreadPool()
+        self.preview_pool.setMaxThreadCount(1)  # PyMuPDF is not thread-safe
+        self.preview_timer = QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+
+        self.file_drop.files_dropped.connect(self.schedule_preview)
+        self.watermark_text_entry.textChanged.connect(self.schedule_preview)
+
+        main_layout.addLayout(layout)
+        main_layout.addWidget(self.preview_label)
+        self.setLayout(main_layout)
 
     def center(self):
         # Set window size
@@ -148,6 +234,100 @@ class WatermarkWindow(QWidget):
         # Move the window's top-left point to the frame geometry's top-left (centered)
         self.move(fg.topLeft())
 
+    def schedule_preview(self, *args):
+        '''
+        Debounce preview updates: restart the timer on every change so only
+        the last change of a burst triggers a render.
+        '''
+
+        self.preview_timer.start()
+
+    def is_preview_stale(self, generation):
+        return generation != self.preview_generation
+
+    def update_preview(self):
+        '''
+        Queue a preview render of the first file with the current options.
+        '''
+
+        file_paths = self.file_drop.file_paths
+        if not file_paths:
+            return
+
+        # Archives are not previewed
+        file_path = file_paths[0]
+        if is_archive(file_path):
+            return
+
+        watermark_text = self.watermark_text_entry.text()
+        do_date = self.checkboxes[0].isChecked()
+        spacing = self.slider_spacing.value() / 100
+
+        # Reuse the watermark layer when only the noise options changed
+        key = (file_path, watermark_text, do_date, spacing,
+            self.preview_font, self.preview_font_size)
+        marked = self.preview_marked[1] if self.preview_marked[0] == key else None
+
+        if do_date:
+            watermark_text = date_text(watermark_text)
+
+        watermark_kwargs = {
+            'watermark_text': watermark_text,
+            'spacing': spacing,
+            'fontname': self.preview_font,
+            'font_size': self.preview_font_size,
+        }
+        noise_kwargs = {
+            'do_noise': self.checkboxes[1].isChecked(),
+            'do_bands': self.checkboxes[2].isChecked(),
+            'seed': zlib.crc32(file_path.encode()),  # Same noise per file
+        }
+
+        self.preview_generation += 1
+        self.preview_key = key
+        worker = PreviewWorker(self.preview_generation, self.is_preview_stale,
+            file_path, self.preview_cache.get(file_path), marked,
+            watermark_kwargs, noise_kwargs)
+        worker.signals.done.connect(self.show_preview)
+        worker.signals.failed.connect(self.show_preview_error)
+        self.preview_pool.start(worker)
+
+    def show_preview(self, generation, file_path, base, marked, qimg):
+        '''
+        Display a finished preview unless a newer one has been requested.
+        :param generation: Request counter of the preview
+        :param file_path: Path to the previewed file
+        :param base: Base raster to cache for the file
+        :param marked: Watermark layer to cache for the current options
+        :param qimg: Rendered preview
+        '''
+
+        self.preview_cache[file_path] = base
+
+        if self.is_preview_stale(generation):
+            return
+
+        self.preview_marked = (self.preview_key, marked)
+
+        pixmap = QtGui.QPixmap.fromImage(qimg).scaled(self.preview_label.size(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation)
+        self.preview_label.setPixmap(pixmap)
+        self.preview_label.setToolTip('')
+
+    def show_preview_error(self, generation, message):
+        '''
+        Report a failed preview unless a newer one has been requested.
+        :param generation: Request counter of the preview
+        :param message: Error message
+        '''
+
+        if self.is_preview_stale(generation):
+            return
+
+        self.preview_label.setText('Preview unavailable')
+        self.preview_label.setToolTip(message)
+
     def click_submit(self):
         # Get the values from the widgets
         file_paths = self.file_drop.file_paths
@@ -166,7 +346,17 @@ class WatermarkWindow(QWidget):
             }
         ''')
 
-        watermark(file_paths, watermark_text, spacing, *options)
+        # Do not run PyMuPDF concurrently with a pending preview
+        self.preview_pool.waitForDone()
+
+        # Use the same font as the preview so the placement matches
+        watermark(file_paths, watermark_text, spacing, *options,
+            fontname=self.preview_font, font_size=self.preview_font_size)
+
+        # Pick a new random font for the next job and refresh the preview
+        self.preview_font = random_font(AVAILABLE_FONTS)
+        self.preview_font_size = random_font_size(FONT_SIZE_RANGE)
+        self.schedule_preview()
         
         # QTimer to reset color after 2 seconds (2000 ms)
         QTimer.singleShot(2000, self.reset_submit_button_color)
@@ -1,11 +1,24 @@
 # Supported files settings
 SUPPORTED_IMAGE_FORMATS = ['.pdf', '.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp']
+SUPPORTED_ARCHIVE_FORMATS = ['.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz']
+
+# Archive output settings
+STDIO_FILENAME = '-'
+MANIFEST_FILENAME = 'manifest.json'
+
+# Flatten settings
+FLATTEN_DPI = 150
+SPILL_PAGES = 20  # Flattened pages kept in memory before writing them to disk
 
 # Window settings
-WINDOW_SIZE = (640, 300)
+WINDOW_SIZE = (960, 420)
 WINDOW_TITLE = 'OpenWatermark'
 WINDOW_ICON = './res/img/icon.ico'
 
+# Preview settings
+PREVIEW_SIZE = (300, 380)
+PREVIEW_DEBOUNCE_MS = 60
+
 # Randomization settings
 AVAILABLE_FONTS = [
     'helv', 'hebo', 'heit', 'hebi',
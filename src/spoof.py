@@ -2,15 +2,17 @@ import numpy as np
 from PIL import Image
 
 
-def add_film_grain(image: Image, intensity: float = 0.1) -> np.ndarray:
+def add_film_grain(image: Image, intensity: float = 0.1,
+    rng=np.random) -> np.ndarray:
     '''
     Adds film grain noise to an RGB image.
     :param image: Input image (numpy array, uint8, shape HxWx3)
     :param intensity: Grain intensity (0-1)
+    :param rng: Random generator, numpy's global one by default
     :return: Noisy image
     '''
 
-    noise = np.random.normal(0, intensity * 255, image.shape).astype(np.float32)
+    noise = rng.normal(0, intensity * 255, image.shape).astype(np.float32)
     noisy = image.astype(np.float32) + noise
 
     return np.clip(noisy, 0, 255).astype(np.uint8)
@@ -39,15 +41,16 @@ def add_banding_noise(image: Image, band_width: int = 5, amplitude: int = 15,
     return np.clip(noisy, 0, 255).astype(np.uint8)
 
 
-def add_shot_noise(image: Image) -> np.ndarray:
+def add_shot_noise(image: Image, rng=np.random) -> np.ndarray:
     '''
     Adds shot (Poisson) noise to an RGB image.
     :param image: Input image (numpy array, uint8, shape HxWx3)
+    :param rng: Random generator, numpy's global one by default
     :return: Noisy image
     '''
 
     image_float = image.astype(np.float32) / 255.0
-    noisy = np.random.poisson(image_float * 255) / 255.0
+    noisy = rng.poisson(image_float * 255) / 255.0
 
     return np.clip(noisy * 255, 0, 255).astype(np.uint8)
 
@@ -1,8 +1,14 @@
 import io
 import os
+import sys
+import json
 import string
+import tarfile
+import posixpath
+import zipfile
 import secrets
 import datetime
+from typing import Iterator
 
 import fitz
 from PIL import Image
@@ -60,19 +66,33 @@ def is_img(filename: str) -> bool:
     return any(filename.lower().endswith(ext) for ext in SUPPORTED_IMAGE_FORMATS)
 
 
-def img2pdf(input_filename: str) -> fitz.Document:
+def iter_img_frames(input_filename: str, stream: bytes = None) -> Iterator[Image.Image]:
     '''
-    Convert an image file to fitz PDF.
+    Iterate over the frames of an image file one at a time.
+    Multi-frame formats (TIFF, GIF, WEBP) are seeked frame by frame so that
+    only the current frame is decoded and held in memory.
     :param input_filename: Path to the input image file
-    :return: fitz.Document object
+    :param stream: Content of the file if it is not read from disk
+    :return: Iterator of RGB PIL images, one per frame
     '''
 
     if not is_img(input_filename):
         raise ValueError('Input file is not a valid image format.')
-    
-    # Open the image file
-    img = Image.open(input_filename)
-    img = img.convert('RGB')  # Convert to RGB if not already
+
+    fp = input_filename if stream is None else io.BytesIO(stream)
+
+    with Image.open(fp) as img:
+        for i in range(getattr(img, 'n_frames', 1)):
+            img.seek(i)
+            yield img.convert('RGB')  # Convert to RGB if not already
+
+
+def frame2pdf(img: Image.Image) -> fitz.Document:
+    '''
+    Convert a single image frame to a one-page fitz PDF.
+    :param img: PIL image of the frame
+    :return: fitz.Document object
+    '''
 
     # Save the image to a BytesIO buffer in PNG format
     img_bytes = io.BytesIO()
@@ -98,22 +118,28 @@ def get_new_pdf_filename(input_file_path: str) -> str:
     return os.path.splitext(os.path.abspath(input_file_path))[0] + '_marked.pdf'
 
 
-def open_document(input_filename: str) -> fitz.Document:
+def iter_document(input_filename: str, stream: bytes = None) -> Iterator[fitz.Document]:
     '''
-    Get the PDF document from the input file.
+    Iterate over the input file as a sequence of PDF documents.
+    A PDF is yielded as a single document, while an image yields one
+    single-page document per frame so that only one decoded frame of a
+    long multi-frame file (e.g. fax TIFF) is held in memory at a time.
     :param input_filename: Path to the input file
-    :return: fitz.Document object
+    :param stream: Content of the file if it is not read from disk
+    :return: Iterator of fitz.Document objects
     '''
 
     # Check if the input file is a PDF or an image
     if input_filename.lower().endswith('.pdf'):
-        doc = fitz.open(input_filename)
+        if stream is None:
+            yield fitz.open(input_filename)
+        else:
+            yield fitz.open(stream=stream, filetype='pdf')
     elif is_img(input_filename):
-        doc = img2pdf(input_filename)
+        for img in iter_img_frames(input_filename, stream):
+            yield frame2pdf(img)
     else:
         raise ValueError('Input file is not a valid PDF or image format.')
-    
-    return doc
 
 
 def save_pwd_to_file(owner_pw: str, input_filename: str) -> None:
@@ -128,4 +154,248 @@ def save_pwd_to_file(owner_pw: str, input_filename: str) -> None:
 
     with open(pwd_file, 'w') as f:
         f.write(owner_pw)
-    
\ No newline at end of file
+
+
+def is_archive(filename: str) -> bool:
+    '''
+    Check if the file is a ZIP or tar archive.
+    :param filename: Path to the file
+    :return: True if the file is an archive, False otherwise
+    '''
+
+    return any(filename.lower().endswith(ext) for ext in SUPPORTED_ARCHIVE_FORMATS)
+
+
+def get_new_archive_filename(input_file_path: str) -> str:
+    '''
+    Generate a new filename for the output archive, keeping its extension.
+    Standard input is mapped to standard output.
+    :param input_file_path: Path to the input archive
+    :return: New filename for the output archive
+    '''
+
+    if input_file_path == STDIO_FILENAME:
+        return STDIO_FILENAME
+
+    p = os.path.abspath(input_file_path)
+
+    for ext in SUPPORTED_ARCHIVE_FORMATS:
+        if p.lower().endswith(ext):
+            return p[:-len(ext)] + '_marked' + p[-len(ext):]
+
+    raise ValueError('Input file is not a valid archive format.')
+
+
+def sanitize_member_name(member_name: str) -> str:
+    '''
+    Normalize an archive member name so that it stays inside the archive
+    root once extracted: leading slashes and drive letters are stripped and
+    names that still escape through '..' are rejected.
+    :param member_name: Name of the archive member
+    :return: Safe relative member name
+    '''
+
+    name = member_name.replace('\\', '/').lstrip('/')
+
+    # Drive letter of Windows paths (e.g. C:/dir/file.pdf)
+    if name[1:2] == ':':
+        name = name[2:].lstrip('/')
+
+    name = posixpath.normpath(name)
+    if name in ('', '.') or '..' in name.split('/'):
+        raise ValueError(f'Archive member escapes the archive root: {member_name}')
+
+    return name
+
+
+def get_new_pdf_member_name(member_name: str, used_names: set) -> str:
+    '''
+    Generate a unique name for the output PDF inside an archive.
+    A counter is appended when another input (e.g. a.pdf and a.png) already
+    produced the same name.
+    :param member_name: Name of the input archive member
+    :param used_names: Member names already written, updated in place
+    :return: New member name for the output PDF
+    '''
+
+    base = os.path.splitext(sanitize_member_name(member_name))[0] + '_marked'
+    new_name = base + '.pdf'
+
+    i = 1
+    while new_name in used_names:
+        new_name = f'{base}_{i}.pdf'
+        i += 1
+
+    used_names.add(new_name)
+
+    return new_name
+
+
+def is_tar_header(header: bytes) -> bool:
+    '''
+    Check if the first bytes of a stream look like a plain or compressed tar.
+    :param header: First 512 bytes of the stream
+    :return: True if the stream is a tar archive, False otherwise
+    '''
+
+    # gzip, bzip2 and xz compressed tar archives
+    if header.startswith((b'\x1f\x8b', b'BZh', b'\xfd7zXZ\x00')):
+        return True
+
+    return header[257:262] == b'ustar'
+
+
+def get_stdin_img_name(data: bytes) -> str:
+    '''
+    Name an image read from standard input after its format.
+    :param data: Content of standard input
+    :return: Filename with the extension of the image format
+    '''
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            filename = 'stdin.' + img.format.lower()
+    except OSError:
+        filename = None
+
+    if filename is None or not is_img(filename):
+        raise ValueError('Standard input is not a PDF, image, ZIP or tar archive.')
+
+    return filename
+
+
+class _PrefixedReader(io.RawIOBase):
+    '''
+    Raw stream replaying a header already read from another stream.
+    '''
+
+    def __init__(self, header: bytes, src):
+        self.header = header
+        self.src = src
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.header:
+            n = min(len(b), len(self.header))
+            b[:n] = self.header[:n]
+            self.header = self.header[n:]
+            return n
+
+        return self.src.readinto(b)
+
+
+def iter_archive(input_filename: str) -> Iterator[tuple]:
+    '''
+    Iterate over the PDF and image members of a ZIP or tar archive without
+    extracting it. Members are read one at a time. Use '-' to read from
+    standard input, which may hold a ZIP or tar archive or a single PDF
+    or image.
+    :param input_filename: Path to the input archive
+    :return: Iterator of tuples containing the member name and its content
+    '''
+
+    if input_filename == STDIO_FILENAME:
+        # Unlike peek(), read() blocks until the whole header or EOF
+        header = sys.stdin.buffer.read(512)
+
+        if header.startswith(b'%PDF'):
+            yield 'stdin.pdf', header + sys.stdin.buffer.read()
+            return
+
+        is_zip = header.startswith(b'PK')
+        if is_zip:
+            # ZIP needs random access, so the archive itself is buffered
+            src = io.BytesIO(header + sys.stdin.buffer.read())
+        elif is_tar_header(header):
+            src = io.BufferedReader(_PrefixedReader(header, sys.stdin.buffer))
+        else:
+            data = header + sys.stdin.buffer.read()
+            yield get_stdin_img_name(data), data
+            return
+    else:
+        src = open(input_filename, 'rb')
+        is_zip = zipfile.is_zipfile(src)
+        src.seek(0)
+
+    try:
+        if is_zip:
+            with zipfile.ZipFile(src) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and is_img(info.filename):
+                        yield info.filename, archive.read(info)
+        else:
+            # Stream mode reads the tar sequentially, one member at a time
+            with tarfile.open(fileobj=src, mode='r|*') as archive:
+                for info in archive:
+                    if info.isfile() and is_img(info.name):
+                        yield info.name, archive.extractfile(info).read()
+    finally:
+        # Leave standard input open for the caller
+        if src is not sys.stdin.buffer:
+            src.close()
+
+
+def open_archive(output_filename: str):
+    '''
+    Open an archive for writing. Use '-' to write a ZIP to standard output.
+    :param output_filename: Path to the output archive
+    :return: zipfile.ZipFile or tarfile.TarFile object
+    '''
+
+    lower = output_filename.lower()
+
+    if output_filename == STDIO_FILENAME:
+        # Non-seekable output is supported by zipfile with data descriptors
+        return zipfile.ZipFile(sys.stdout.buffer, 'w')
+    elif lower.endswith('.zip'):
+        return zipfile.ZipFile(output_filename, 'w')
+    elif lower.endswith(('.tar.gz', '.tgz')):
+        return tarfile.open(output_filename, 'w|gz')
+    elif lower.endswith('.tar.bz2'):
+        return tarfile.open(output_filename, 'w|bz2')
+    elif lower.endswith('.tar.xz'):
+        return tarfile.open(output_filename, 'w|xz')
+    elif lower.endswith('.tar'):
+        return tarfile.open(output_filename, 'w|')
+    else:
+        raise ValueError('Output file is not a valid archive format.')
+
+
+def write_archive_member(archive, member_name: str, data: bytes) -> None:
+    '''
+    Write a file into an archive opened with open_archive().
+    Members are stored read-only, mirroring the files written to disk.
+    :param archive: zipfile.ZipFile or tarfile.TarFile object
+    :param member_name: Name of the member in the archive
+    :param data: Content of the member
+    '''
+
+    if isinstance(archive, zipfile.ZipFile):
+        info = zipfile.ZipInfo(member_name, datetime.datetime.now().timetuple()[:6])
+        info.external_attr = 0o100444 << 16
+        archive.writestr(info, data)
+    else:
+        info = tarfile.TarInfo(member_name)
+        info.size = len(data)
+        info.mode = 0o444
+        info.mtime = int(datetime.datetime.now().timestamp())
+        archive.addfile(info, io.BytesIO(data))
+
+
+def save_manifest_to_archive(archive, output_filenames: list, owner_pw: str = None) -> None:
+    '''
+    Save a manifest listing the input and output members, and the password
+    if given, into the output archive.
+    :param archive: zipfile.ZipFile or tarfile.TarFile object
+    :param output_filenames: List of dicts with the input and output names
+    :param owner_pw: Password for the PDFs, omitted if None
+    '''
+
+    manifest = {'files': output_filenames}
+    if owner_pw is not None:
+        manifest['owner_password'] = owner_pw
+
+    data = json.dumps(manifest, indent=4).encode('utf-8')
+    write_archive_member(archive, MANIFEST_FILENAME, data)
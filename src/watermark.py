@@ -1,6 +1,8 @@
 import os
 import io
 import math
+import shutil
+import tempfile
 
 import fitz
 import numpy as np
@@ -12,9 +14,32 @@ from .spoof import *
 from .utils import *
 
 
+def add_noise(img_arr: np.ndarray, do_noise: bool = True,
+    do_bands: bool = True, scale: float = 1.0, rng=np.random) -> np.ndarray:
+    '''
+    Apply the noise layers to a rendered page.
+    :param img_arr: Input image (numpy array, uint8, shape HxWx3)
+    :param do_noise: Whether to add shot, periodic and film grain noise
+    :param do_bands: Whether to add banding noise
+    :param scale: Resolution relative to FLATTEN_DPI, scales the patterns
+    :param rng: Random generator, numpy's global one by default
+    :return: Noisy image
+    '''
+
+    if do_noise:
+        img_arr = add_shot_noise(img_arr, rng=rng)
+        img_arr = add_periodic_noise(img_arr, frequency=10 * scale)
+        img_arr = add_film_grain(img_arr, rng=rng)
+
+    if do_bands:
+        img_arr = add_banding_noise(img_arr, band_width=max(1, round(5 * scale)))
+
+    return img_arr
+
+
 def flatten_pdf(doc: fitz.Document, 
     do_noise: bool = True, do_bands: bool = True, 
-    dpi: int = 150) -> fitz.Document:
+    dpi: int = FLATTEN_DPI, out: fitz.Document = None) -> fitz.Document:
     '''
     Flatten the PDF document by rendering each page to an image and then
     converting it back to a PDF page. This can help in removing any
@@ -23,23 +48,17 @@ def flatten_pdf(doc: fitz.Document,
     :param do_noise: Whether to add noise to the PDF pages
     :param do_bands: Whether to add banding noise to the PDF pages
     :param dpi: DPI for rendering the pages
+    :param out: Document to append the flattened pages to, a new one if None
     :return: Flattened PDF document
     '''
 
-    out = fitz.open()
+    if out is None:
+        out = fitz.open()
 
     for page in doc:
         pix = page.get_pixmap(dpi=dpi)
         img = pix.pil_image()
-        img_arr = np.array(img)
-
-        if do_noise:
-            img_arr = add_shot_noise(img_arr)
-            img_arr = add_periodic_noise(img_arr)
-            img_arr = add_film_grain(img_arr)
-
-        if do_bands:
-            img_arr = add_banding_noise(img_arr)
+        img_arr = add_noise(np.array(img), do_noise, do_bands)
 
         # Convert PIL image back to Pixmap for PyMuPDF
         img = Image.fromarray(img_arr)
@@ -47,13 +66,11 @@ def flatten_pdf(doc: fitz.Document,
         # Imge to bytes and compress
         buf = io.BytesIO()
         img.save(buf, format='JPEG', quality=80)
-        buf.seek(0)
-        noisy_pix = fitz.Pixmap(buf)
 
-        # New page with noisy image
+        # New page with noisy image, kept as JPEG rather than a raw pixmap
         rect = page.rect
         outpage = out.new_page(width=rect.width, height=rect.height)
-        outpage.insert_image(rect, pixmap=noisy_pix)
+        outpage.insert_image(rect, stream=buf.getvalue())
 
     return out
 
@@ -145,12 +162,163 @@ def add_watermark(
     return doc
 
 
+def get_preview_dpi(rect: fitz.Rect) -> float:
+    '''
+    Get the DPI at which a page fits in the preview pane.
+    :param rect: Page rect in points
+    :return: DPI for rendering the preview
+    '''
+
+    return 72 * min(PREVIEW_SIZE[0] / rect.width, PREVIEW_SIZE[1] / rect.height)
+
+
+def render_preview_base(input_filename: str) -> tuple:
+    '''
+    Render the first page of the input file so that it fits the preview pane.
+    The result is meant to be cached and reused by render_preview_watermark().
+    :param input_filename: Path to the input file
+    :return: Tuple containing the page pixmap, the page rect and the DPI
+    '''
+
+    chunks = iter_document(input_filename)
+    chunk = None
+
+    try:
+        chunk = next(chunks)
+        page = chunk[0]
+        dpi = get_preview_dpi(page.rect)
+        base = (page.get_pixmap(dpi=dpi), fitz.Rect(page.rect), dpi)
+    finally:
+        # Release the input file
+        if chunk is not None:
+            chunk.close()
+        chunks.close()
+
+    return base
+
+
+def render_preview_watermark(base: tuple, watermark_text: str,
+    spacing: float = 0.60, fontname: str = 'helv',
+    font_size: int = 40) -> np.ndarray:
+    '''
+    Composite the watermark layer on top of a cached base page.
+    The result is meant to be cached and reused by render_preview_noise().
+    :param base: Tuple returned by render_preview_base()
+    :param watermark_text: Text for the watermark
+    :param spacing: Spacing between watermarks
+    :param fontname: Font name for the watermark
+    :param font_size: Font size for the watermark
+    :return: Watermarked page (numpy array, uint8, shape HxWx3)
+    '''
+
+    pix, rect, dpi = base
+
+    # One page document holding the base raster
+    doc = fitz.open()
+    page = doc.new_page(width=rect.width, height=rect.height)
+    page.insert_image(page.rect, pixmap=pix)
+
+    # Watermark and render back at the preview resolution
+    doc = add_watermark(doc, watermark_text, fontname, font_size, spacing)
+    img = doc[0].get_pixmap(dpi=dpi).pil_image()
+    doc.close()
+
+    return np.array(img.convert('RGB'))
+
+
+def render_preview_noise(img_arr: np.ndarray, dpi: float,
+    do_noise: bool = True, do_bands: bool = True,
+    seed: int = 0) -> Image.Image:
+    '''
+    Add the noise layers to a watermarked preview page. The noise is scaled
+    to look like it does at FLATTEN_DPI and seeded so it does not flicker.
+    :param img_arr: Page returned by render_preview_watermark()
+    :param dpi: DPI the page was rendered at
+    :param do_noise: Whether to add noise to the preview
+    :param do_bands: Whether to add banding noise to the preview
+    :param seed: Seed for the noise
+    :return: PIL image of the preview
+    '''
+
+    rng = np.random.default_rng(seed)
+    img_arr = add_noise(img_arr, do_noise, do_bands, dpi / FLATTEN_DPI, rng)
+
+    return Image.fromarray(img_arr)
+
+
+def spill_document(doc: fitz.Document, spill_path: str) -> fitz.Document:
+    '''
+    Write the document to disk and reopen it, so that its pages are read back
+    from the file when needed instead of being held in memory.
+    :param doc: Document to spill
+    :param spill_path: Path to the temporary file backing the document
+    :return: fitz.Document opened from the temporary file
+    '''
+
+    # Only the new pages are appended once the file exists
+    if doc.name == spill_path:
+        doc.saveIncr()
+    else:
+        doc.save(spill_path)
+    doc.close()
+
+    return fitz.open(spill_path)
+
+
+def mark_document(input_filename: str, watermark_text: str, fontname: str,
+    font_size: int, spacing: float, do_noise: bool = True, do_bands: bool = True,
+    stream: bytes = None, spill_dir: str = None) -> fitz.Document:
+    '''
+    Watermark and flatten a single input file.
+    :param input_filename: Path to the input file (or archive member name)
+    :param watermark_text: Text for the watermark
+    :param fontname: Font name for the watermark
+    :param font_size: Font size for the watermark
+    :param spacing: Spacing between watermarks
+    :param do_noise: Whether to add noise to the PDF pages
+    :param do_bands: Whether to add banding noise to the PDF pages
+    :param stream: Content of the file if it is not read from disk
+    :param spill_dir: Directory where flattened pages are written every
+        SPILL_PAGES pages, kept in memory if None
+    :return: Watermarked and flattened fitz.Document
+    '''
+
+    doc = fitz.open()
+    spilled = 0
+
+    spill_path = None
+    if spill_dir is not None:
+        fd, spill_path = tempfile.mkstemp(suffix='.pdf', dir=spill_dir)
+        os.close(fd)
+
+    # Stream the input one chunk at a time (one per frame for images)
+    for chunk in iter_document(input_filename, stream):
+        # Watermark the chunk
+        chunk = add_watermark(chunk, watermark_text, fontname, font_size, spacing)
+
+        # Flatten chunk, add noise to pages and append them to the output
+        flatten_pdf(chunk, do_noise, do_bands, out=doc)
+        chunk.close()
+
+        # Keep memory bounded for inputs with many pages (e.g. fax TIFFs)
+        if spill_path is not None and len(doc) - spilled >= SPILL_PAGES:
+            doc = spill_document(doc, spill_path)
+            spilled = len(doc)
+
+    return doc
+
+
 def watermark(input_filenames: list, watermark_text: str, spacing: float = 0.60,
     do_date: bool = True, do_noise: bool = True, do_bands: bool = True, 
-    do_lock: bool = True, do_save_pwd: bool = True) -> tuple:
+    do_lock: bool = True, do_save_pwd: bool = True,
+    output_filename: str = None, fontname: str = None,
+    font_size: int = None) -> tuple:
     '''
     Add a watermark to a PDF document and save it with encryption.
-    :param input_filenames: List of input PDF filenames
+    ZIP and tar archives, or '-' for standard input, are streamed member by
+    member without being extracted. Their results, along with a manifest,
+    are written to an output archive instead of next to the input files.
+    :param input_filenames: List of input PDF, image or archive filenames
     :param watermark_text: Text for the watermark
     :param spacing: Spacing between watermarks
     :param do_date: Whether to add the current date and time to the watermark
@@ -158,6 +326,10 @@ def watermark(input_filenames: list, watermark_text: str, spacing: float = 0.60,
     :param do_bands: Whether to add banding noise to the PDF pages
     :param do_lock: Whether to lock the PDF with a password
     :param do_save_pwd: Whether to save the password to a txt file
+    :param output_filename: Output archive, '-' for standard output.
+        Defaults to None, which writes to disk unless an input is an archive
+    :param fontname: Font name for the watermark, random if None
+    :param font_size: Font size for the watermark, random if None
     :return: Tuple containing the output filename and owner password
     '''
 
@@ -172,49 +344,107 @@ def watermark(input_filenames: list, watermark_text: str, spacing: float = 0.60,
     # Set permissions
     perm = get_pdf_permissions(do_lock)
 
-    # Generate random font size and font name
-    font_size = random_font_size(FONT_SIZE_RANGE)
-    fontname = random_font(AVAILABLE_FONTS)
-
-    output_pdf_filenames = []
-
-    for filename in input_filenames:
-        # Generate a new filename for the output PDF
-        output_pdf_filename = get_new_pdf_filename(filename)
-        output_pdf_filenames.append(output_pdf_filename)
-
-        # Get the PDF document
-        doc = open_document(filename)
-
-        # Watermark the PDF
-        doc = add_watermark(doc, watermark_text, fontname, font_size, spacing)
-
-        # Flatten PDF and add noise to pages
-        doc = flatten_pdf(doc, do_noise, do_bands)
+    # Generate random font size and font name unless given
+    if font_size is None:
+        font_size = random_font_size(FONT_SIZE_RANGE)
+    if fontname is None:
+        fontname = random_font(AVAILABLE_FONTS)
+
+    save_options = {
+        'garbage': 3,
+        'deflate': True,
+        'preserve_metadata': False,
+        'clean': True,
+        'linear': True,
+        'encryption': fitz.PDF_ENCRYPT_AES_256,
+        'user_pw': '',
+        'owner_pw': owner_pw,
+        'permissions': perm,
+        'compression_effort': 4,
+    }
 
-        # Save the document with encryption
-        doc.save(output_pdf_filename, garbage=3,
-                deflate=True, preserve_metadata=False,
-                clean=True, linear=True,
-                encryption=fitz.PDF_ENCRYPT_AES_256,
-                user_pw='',
-                owner_pw=owner_pw,
-                permissions=perm,
-                compression_effort=4)
-        
-        # Close the document
-        doc.close()
+    # Archive inputs are written to an archive named after the first one
+    archive_inputs = [f for f in input_filenames
+        if f == STDIO_FILENAME or is_archive(f)]
+    if output_filename is None and archive_inputs:
+        output_filename = get_new_archive_filename(archive_inputs[0])
 
-        # Set file as read-only
-        os.chmod(output_pdf_filename, 0o444)
+    archive = open_archive(output_filename) if output_filename else None
 
-    # Save the password to a text file if required
-    if do_save_pwd:
-        save_pwd_to_file(owner_pw, input_filenames[0])
+    output_pdf_filenames = []
+    manifest = []
+    used_names = set()
+    success = False
+
+    # Temporary files backing the flattened documents
+    spill_dir = tempfile.mkdtemp()
+
+    try:
+        for filename in input_filenames:
+            is_archive_input = filename in archive_inputs
+            members = iter_archive(filename) if is_archive_input else [(filename, None)]
+
+            try:
+                for name, stream in members:
+                    # Watermark, flatten and add noise to the document
+                    doc = mark_document(name, watermark_text, fontname, font_size,
+                        spacing, do_noise, do_bands, stream, spill_dir)
+
+                    if archive is None:
+                        # Generate a new filename for the output PDF
+                        output_pdf_filename = get_new_pdf_filename(name)
+
+                        # Save the document with encryption
+                        doc.save(output_pdf_filename, **save_options)
+
+                        # Set file as read-only
+                        os.chmod(output_pdf_filename, 0o444)
+                    else:
+                        # Files from disk are stored at the root of the archive
+                        member_name = name if is_archive_input else os.path.basename(name)
+                        output_pdf_filename = get_new_pdf_member_name(member_name, used_names)
+
+                        # Write the encrypted document straight into the archive
+                        write_archive_member(archive, output_pdf_filename,
+                            doc.tobytes(**save_options))
+
+                        entry = {'input': name, 'output': output_pdf_filename}
+                        if is_archive_input:
+                            entry['archive'] = filename
+                        manifest.append(entry)
+
+                    output_pdf_filenames.append(output_pdf_filename)
+
+                    # Close the document
+                    doc.close()
+            finally:
+                # Release the input archive
+                if is_archive_input:
+                    members.close()
+
+        if archive is not None:
+            # Save the manifest, with the password if required, to the archive
+            save_manifest_to_archive(archive, manifest,
+                owner_pw if do_save_pwd else None)
+        elif do_save_pwd:
+            # Save the password to a text file if required
+            save_pwd_to_file(owner_pw, input_filenames[0])
+
+        success = True
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+        if archive is not None:
+            archive.close()
+
+            # Do not leave a partial archive behind
+            if not success and output_filename != STDIO_FILENAME:
+                os.remove(output_filename)
 
     # Return the output filenames and owner password
     info = {
         'output_filenames': output_pdf_filenames,
+        'output_archive': output_filename,
         'owner_password': owner_pw
     }
 